@@ -2,47 +2,309 @@
 Google Calendar API wrapper for various calendar operations.
 """
 
+import json
+import logging
 import os
 import pickle
+import random
+import sys
+import threading
+import time
+import uuid
+import httplib2
 from google.auth.transport.requests import Request
+from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.model import JsonModel
+from google_auth_httplib2 import AuthorizedHttp
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# In-process caches keyed by (credentials_file, token_file), so that creating
+# several GoogleCalendarAPI instances doesn't reload the token or rebuild the
+# service each time
+_CRED_CACHE = {}
+_SERVICE_CACHE = {}
+
+# HTTP statuses worth retrying, 403 only with one of the rate-limit reasons
+RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+RATE_LIMIT_REASONS = ('rateLimitExceeded', 'userRateLimitExceeded')
+# Transport failures (reset or refused connections, timeouts, DNS errors)
+TRANSPORT_ERRORS = (OSError, httplib2.HttpLib2Error)
+
+
+class _OrjsonModel(JsonModel):
+    """JsonModel decoding API responses with orjson"""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Non-JSON bodies are handled (returned as-is) by JsonModel
+            return super().deserialize(content)
+        if self._data_wrapper and isinstance(body, dict) and 'data' in body:
+            body = body['data']
+        return body
+
+
+def _index_events_by_date(events, tzinfo=None):
+    """Group events by their 'YYYY-MM-DD' start date in a single pass.
+
+    With tzinfo, timed events are keyed on their start date in that
+    timezone rather than in the offset they are listed with.
+    """
+    index = defaultdict(list)
+    for event in events:
+        # Incremental sync reports deleted events with status 'cancelled'
+        if event.get('status') == 'cancelled':
+            continue
+        event_start = event['start'].get('dateTime') or event['start'].get('date')
+        if tzinfo is not None and 'dateTime' in event['start']:
+            event_start = datetime.fromisoformat(event_start).astimezone(tzinfo).isoformat()
+        index[event_start[:10]].append(event)
+    return index
+
+
+def _event_time(event_time, tzinfo):
+    """Parse an event start/end, all-day dates being taken in tzinfo"""
+    if 'dateTime' in event_time:
+        return datetime.fromisoformat(event_time['dateTime'])
+    return datetime.fromisoformat(event_time['date']).replace(tzinfo=tzinfo)
+
+
+def _events_in_range(events, start_date, end_date):
+    """Filter events overlapping [start_date, end_date), ordered by start time"""
+    in_range = []
+    for event in events:
+        start = _event_time(event['start'], start_date.tzinfo)
+        end = _event_time(event['end'], start_date.tzinfo)
+        if end > start_date and start < end_date:
+            in_range.append((start, event))
+
+    in_range.sort(key=lambda item: item[0])
+    return [event for _, event in in_range]
+
+
+def _is_retryable(error):
+    """Tell whether an HttpError is a transient rate-limit or server error"""
+    status = error.resp.status
+    if status == 403:
+        # 403 is also used for permission errors, only retry rate limiting
+        details = error.error_details if isinstance(error.error_details, list) else []
+        return any(
+            isinstance(detail, dict) and detail.get('reason') in RATE_LIMIT_REASONS
+            for detail in details
+        )
+    return status in RETRYABLE_STATUSES
+
+
+def _new_event_id():
+    """Client-side event id, so that replaying an insert fails with 409.
+
+    Event ids use base32hex characters (a-v, 0-9), which hex digits are.
+    """
+    return uuid.uuid4().hex
+
+
+def _is_conflict(error):
+    """Tell whether an HttpError is a 409, i.e. an insert already applied"""
+    return isinstance(error, HttpError) and error.resp.status == 409
+
+
+def _exec_with_backoff(request, max_attempts=5, http=None):
+    """Execute an API request, backing off on transient failures.
+
+    Rate-limit and server errors are retried, as are transport errors;
+    other HTTP errors (auth, not found, bad request) are raised at once.
+    Honors the Retry-After header when present (up to 32 seconds), otherwise
+    sleeps min(2 ** attempt, 32) seconds plus jitter between attempts. `http`
+    overrides the transport the request was built with.
+    """
+    for attempt in range(max_attempts):
+        delay = min(2 ** attempt, 32) + random.random()
+        try:
+            return request.execute(http=http)
+        except HttpError as error:
+            if attempt == max_attempts - 1 or not _is_retryable(error):
+                raise
+
+            retry_after = error.resp.get('retry-after', '')
+            if retry_after.isdigit():
+                # Capped like the exponential delay, not to stall a worker
+                delay = min(int(retry_after), 32)
+            logger.warning('Calendar API returned HTTP %s, retrying in %.1fs',
+                           error.resp.status, delay)
+        except TRANSPORT_ERRORS as error:
+            if attempt == max_attempts - 1:
+                raise
+            logger.warning('Calendar API request failed (%s), retrying in %.1fs',
+                           error, delay)
+        time.sleep(delay)
+
+
+class _RateLimiter:
+    """Token bucket shared by worker threads to cap the request rate"""
+
+    def __init__(self, rate):
+        self.rate = rate
+        self.tokens = rate
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a request may be sent"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.rate, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
 
 class GoogleCalendarAPI:
-    def __init__(self, credentials_file='credentials.json', token_file='token.pickle'):
-        """Initialize the Google Calendar API"""
+    # Google Calendar accepts at most 50 calls per batch request
+    BATCH_SIZE = 50
+    # Largest page size accepted by events().list
+    MAX_PAGE_SIZE = 2500
+
+    # Partial responses: only request the event fields that are actually read
+    LIST_FIELDS = 'items(id,summary,start,end)'
+    RANGE_FIELDS = 'items(id,summary,start,end,extendedProperties),nextPageToken'
+    SYNC_FIELDS = 'items(id,status,start,end),nextPageToken,nextSyncToken'
+    MIRROR_FIELDS = ('items(id,status,summary,start,end,extendedProperties),'
+                     'nextPageToken,nextSyncToken')
+
+    def __init__(self, credentials_file='credentials.json', token_file='token.json',
+                 sync_state_file=None):
+        """Initialize the Google Calendar API.
+
+        sync_state_file enables incremental sync in get_events_in_range, and
+        keeps incremental_sync working across runs: their sync tokens (one
+        per consumer) and the get_events_in_range mirrors are persisted there.
+        """
         # Define the scopes
         self.SCOPES = ['https://www.googleapis.com/auth/calendar']
         self.credentials_file = credentials_file
+        # A token file configured as token.pickle (the old default) is only
+        # read to migrate it: the JSON token is kept next to it
+        base, ext = os.path.splitext(token_file)
+        if ext == '.pickle':
+            token_file = base + '.json'
         self.token_file = token_file
+        self.creds = None
         self.service = None
+        self.sync_state_file = sync_state_file
+        self._sync_state = None
+        # httplib2 is not thread-safe: worker threads get their own transport
+        self._thread_local = threading.local()
         self.authenticate()
 
     def authenticate(self):
         """Authenticate and create the calendar service"""
-        creds = None
+        cache_key = (self.credentials_file, self.token_file)
+        creds = _CRED_CACHE.get(cache_key)
 
-        # Load existing token if it exists
-        if os.path.exists(self.token_file):
-            with open(self.token_file, 'rb') as token:
-                creds = pickle.load(token)
+        # Load existing token if it exists and nothing is cached yet
+        migrated = False
+        if creds is None:
+            creds, migrated = self._load_token()
+
+        previous_token = creds.token if creds else None
 
         # If there are no valid credentials, request authorization
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
                 creds.refresh(Request())
             else:
+                # Headless (cron, CI, docker without a tty): nobody can
+                # complete the browser flow, fail instead of blocking
+                if not sys.stdin or not sys.stdin.isatty():
+                    raise RuntimeError(
+                        f'No usable Google token in {self.token_file} and no '
+                        'terminal to authorize: create it by running once '
+                        'interactively')
                 flow = InstalledAppFlow.from_client_secrets_file(
                     self.credentials_file, self.SCOPES)
                 creds = flow.run_local_server(port=0)
 
-            # Save credentials for next run
-            with open(self.token_file, 'wb') as token:
-                pickle.dump(creds, token)
+        # Save credentials for next run, only when they actually changed
+        if migrated or creds.token != previous_token:
+            with open(self.token_file, 'w') as token:
+                token.write(creds.to_json())
+
+        _CRED_CACHE[cache_key] = creds
+        self.creds = creds
+
+        # Reuse the service built for these credentials, if any
+        cached = _SERVICE_CACHE.get(cache_key)
+        if cached is not None and cached[0] is creds:
+            self.service = cached[1]
+        else:
+            # The client bundles the calendar v3 discovery document: build it
+            # offline, with no discovery fetch or file cache lookup
+            self.service = build(
+                'calendar',
+                'v3',
+                credentials=creds,
+                static_discovery=True,
+                cache_discovery=False,
+                model=_OrjsonModel() if orjson else None,
+            )
+            _SERVICE_CACHE[cache_key] = (creds, self.service)
+
+    def _load_token(self):
+        """Load stored credentials, returning (creds, migrated).
+
+        The token file holds the JSON of `Credentials.to_json()`. Tokens used
+        to be pickled to `token.pickle`: only when the token file is missing,
+        a legacy pickle next to it is loaded and flagged as migrated, so that
+        it gets rewritten as JSON and never unpickled again.
+        """
+        if not os.path.exists(self.token_file):
+            legacy_file = os.path.splitext(self.token_file)[0] + '.pickle'
+            if not os.path.exists(legacy_file):
+                return None, False
+            logger.warning('Migrating legacy pickled token %s to %s',
+                           legacy_file, self.token_file)
+            with open(legacy_file, 'rb') as token:
+                return pickle.load(token), True
+
+        with open(self.token_file, 'rb') as token:
+            data = token.read()
+        if not data.strip():
+            return None, False
 
-        self.service = build('calendar', 'v3', credentials=creds)
+        try:
+            info = json.loads(data.decode('utf-8'))
+        except ValueError:
+            # UnicodeDecodeError (a binary pickle) is a ValueError too
+            raise ValueError(
+                f'{self.token_file} is not a JSON token, re-create it from '
+                'creds.to_json()') from None
+        return Credentials.from_authorized_user_info(info, self.SCOPES), False
+
+    def _thread_http(self):
+        """Get an authorized HTTP transport owned by the calling thread"""
+        http = getattr(self._thread_local, 'http', None)
+        if http is None:
+            http = AuthorizedHttp(self.creds, http=build_http())
+            self._thread_local.http = http
+        return http
 
     def create_calendar(self, summary, description="", timezone="Europe/Paris", location=""):
         """Create a new calendar"""
@@ -56,13 +318,12 @@ class GoogleCalendarAPI:
 
             created_calendar = self.service.calendars().insert(body=calendar).execute()
 
-            print(f'Calendar created successfully!')
-            print(f'- Name: {created_calendar["summary"]}')
-            print(f'- ID: {created_calendar["id"]}')
+            logger.debug('Calendar created: %s (ID: %s)',
+                         created_calendar['summary'], created_calendar['id'])
 
             return created_calendar
         except Exception as error:
-            print(f'An error occurred while creating calendar: {error}')
+            logger.error('An error occurred while creating calendar: %s', error)
             return None
 
     def list_calendars(self):
@@ -71,13 +332,14 @@ class GoogleCalendarAPI:
             calendars_result = self.service.calendarList().list().execute()
             calendars = calendars_result.get('items', [])
 
-            print('Available Calendars:')
-            for calendar in calendars:
-                print(f"- {calendar['summary']} (ID: {calendar['id']})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Available calendars:')
+                for calendar in calendars:
+                    logger.debug('- %s (ID: %s)', calendar['summary'], calendar['id'])
 
             return calendars
         except Exception as error:
-            print(f'An error occurred: {error}')
+            logger.error('An error occurred listing calendars: %s', error)
             return None
 
     def get_events(self, calendar_id='primary', max_results=10, time_min=None, time_max=None):
@@ -92,99 +354,293 @@ class GoogleCalendarAPI:
                 timeMax=time_max,
                 maxResults=max_results,
                 singleEvents=True,
-                orderBy='startTime'
+                orderBy='startTime',
+                fields=self.LIST_FIELDS
             ).execute()
 
             events = events_result.get('items', [])
 
             if not events:
-                print('No upcoming events found.')
+                logger.debug('No upcoming events found.')
                 return []
 
-            print(f'Upcoming {len(events)} events:')
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                print(f"- {event['summary']} ({start})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Upcoming %d events:', len(events))
+                for event in events:
+                    start = event['start'].get('dateTime', event['start'].get('date'))
+                    logger.debug('- %s (%s)', event['summary'], start)
 
             return events
         except Exception as error:
-            print(f'An error occurred: {error}')
+            logger.error('An error occurred getting events: %s', error)
             return None
 
-    def get_events_in_range(self, calendar_id, start_date, end_date):
-        """Get events in a specific date range"""
+    def _list_pages(self, **params):
+        """Yield each events().list response, following nextPageToken"""
+        page_token = None
+        while True:
+            events_result = _exec_with_backoff(self.service.events().list(
+                pageToken=page_token, **params))
+            yield events_result
+
+            page_token = events_result.get('nextPageToken')
+            if not page_token:
+                return
+
+    def _list_all_events(self, **params):
+        """List events, following nextPageToken until every page is fetched"""
+        return [
+            event
+            for events_result in self._list_pages(**params)
+            for event in events_result.get('items', [])
+        ]
+
+    def get_events_in_range(self, calendar_id, start_date, end_date, fields=None):
+        """Get events in a specific date range.
+
+        fields narrows the listed event representation (defaults to
+        RANGE_FIELDS). With a sync_state_file, events come from a local
+        mirror of the calendar kept up to date with sync tokens, instead of
+        listing the whole range again; the mirror keeps MIRROR_FIELDS.
+
+        The mirror's first sync (and any sync after its token expires) lists
+        the whole calendar, with no time bound: sync tokens can't be combined
+        with timeMin/timeMax. Only use a sync_state_file that persists between
+        runs, or every run pays for that full sync.
+        """
+        if self.sync_state_file:
+            try:
+                events = self._synced_events(calendar_id, prune_before=start_date)
+                if events is not None:
+                    return _events_in_range(events, start_date, end_date)
+            except Exception as error:
+                logger.warning('Incremental sync failed, listing the range instead: %s', error)
+
         try:
-            events_result = self.service.events().list(
+            return self._list_all_events(
                 calendarId=calendar_id,
                 timeMin=start_date.isoformat(),
                 timeMax=end_date.isoformat(),
                 singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-            
-            return events_result.get('items', [])
+                orderBy='startTime',
+                maxResults=self.MAX_PAGE_SIZE,
+                fields=fields or self.RANGE_FIELDS
+            )
+        except Exception as error:
+            logger.error('Error getting events in range: %s', error)
+            return []
+
+    def _list_changes(self, calendar_id, sync_token, fields=None):
+        """List events changed since sync_token (all events if None)"""
+        events = []
+        next_sync_token = None
+        for events_result in self._list_pages(
+                calendarId=calendar_id,
+                syncToken=sync_token,
+                singleEvents=True,
+                maxResults=self.MAX_PAGE_SIZE,
+                fields=fields or self.SYNC_FIELDS):
+            events.extend(events_result.get('items', []))
+            next_sync_token = events_result.get('nextSyncToken')
+        return events, next_sync_token
+
+    def _sync_changes(self, calendar_id, sync_token, fields=None):
+        """List changes like `_list_changes`, doing a full sync if the token expired.
+
+        Returns (events, next_sync_token, full_sync).
+        """
+        if sync_token is not None:
+            try:
+                return (*self._list_changes(calendar_id, sync_token, fields), False)
+            except HttpError as error:
+                if error.resp.status != 410:
+                    raise
+                # 410 Gone: the sync token expired, start over with a full sync
+                logger.info('Sync token expired for %s, running a full sync', calendar_id)
+
+        return (*self._list_changes(calendar_id, None, fields), True)
+
+    def incremental_sync(self, calendar_id):
+        """Get the events changed since the previous sync of a calendar.
+
+        The first sync is a full sync returning every event; later ones only
+        return created, updated and deleted (status 'cancelled') events, with
+        the SYNC_FIELDS only. The sync token is kept in the sync_state_file
+        when one is set, so the previous sync can be from an earlier run;
+        otherwise only from this instance. It is separate from the
+        get_events_in_range mirror's token, so neither consumes the other's
+        changes. Returns None on error.
+        """
+        try:
+            sync_tokens = self._load_sync_state()['sync_tokens']
+            events, next_sync_token, _ = self._sync_changes(
+                calendar_id, sync_tokens.get(calendar_id))
+            sync_tokens[calendar_id] = next_sync_token
+            self._save_sync_state()
+            return events
         except Exception as error:
-            print(f'Error getting events in range: {error}')
+            logger.error('Error syncing events of %s: %s', calendar_id, error)
+            return None
+
+    def _load_sync_state(self):
+        """Load the persisted sync tokens and calendar mirrors, once per instance.
+
+        The state holds the incremental_sync tokens ('sync_tokens') and the
+        get_events_in_range mirrors ('mirrors'), both keyed by calendar id.
+        """
+        if self._sync_state is None:
+            self._sync_state = {'sync_tokens': {}, 'mirrors': {}}
+            if self.sync_state_file and os.path.exists(self.sync_state_file):
+                with open(self.sync_state_file) as state_file:
+                    saved_state = json.load(state_file)
+                for key in self._sync_state:
+                    self._sync_state[key].update(saved_state.get(key, {}))
+        return self._sync_state
+
+    def _save_sync_state(self):
+        """Persist the sync tokens and calendar mirrors, if a sync_state_file is set"""
+        if self.sync_state_file:
+            with open(self.sync_state_file, 'w') as state_file:
+                json.dump(self._sync_state, state_file)
+
+    def _synced_events(self, calendar_id, prune_before=None):
+        """Apply the changes since the last sync to a calendar mirror, return its events.
+
+        Events ending before prune_before are dropped from the mirror, so
+        that past events don't pile up in the state file. Returns None when
+        the mirror was already pruned past prune_before and can't cover it.
+        """
+        mirrors = self._load_sync_state()['mirrors']
+        mirror = mirrors.get(calendar_id, {})
+
+        changes, next_sync_token, full_sync = self._sync_changes(
+            calendar_id, mirror.get('sync_token'), self.MIRROR_FIELDS)
+
+        events = {} if full_sync else mirror.get('events', {})
+        for event in changes:
+            if event.get('status') == 'cancelled':
+                events.pop(event['id'], None)
+            else:
+                events[event['id']] = event
+
+        # A full sync relists everything, earlier prunes no longer apply
+        pruned_before = None if full_sync else mirror.get('pruned_before')
+        mirror = {
+            'sync_token': next_sync_token,
+            'events': events,
+            'pruned_before': pruned_before,
+        }
+        mirrors[calendar_id] = mirror
+
+        if prune_before is not None:
+            if pruned_before and prune_before < datetime.fromisoformat(pruned_before):
+                self._save_sync_state()
+                return None
+            mirror['events'] = {
+                event_id: event
+                for event_id, event in events.items()
+                if _event_time(event['end'], prune_before.tzinfo) > prune_before
+            }
+            mirror['pruned_before'] = prune_before.isoformat()
+        self._save_sync_state()
+        return list(mirror['events'].values())
+
+    def get_shifts(self, employee_id, start_date, end_date, calendar_id='primary'):
+        """Get the shift events of one employee in a date range.
+
+        Filters server-side on the `employee_id` private extended property
+        set when the shifts were created.
+        """
+        try:
+            return self._list_all_events(
+                calendarId=calendar_id,
+                privateExtendedProperty=f'employee_id={employee_id}',
+                timeMin=start_date.isoformat(),
+                timeMax=end_date.isoformat(),
+                singleEvents=True,
+                orderBy='startTime',
+                maxResults=self.MAX_PAGE_SIZE,
+                fields='items(id,summary,start,end),nextPageToken'
+            )
+        except Exception as error:
+            logger.error('Error getting shifts for employee %s: %s', employee_id, error)
             return []
 
+    def _build_event_body(self, summary, start_time, end_time, description='', location='',
+                          timezone='UTC', color_id=None, reminders=None,
+                          extended_properties=None):
+        """Build the request body for an event insert"""
+        event = {
+            'summary': summary,
+            'location': location,
+            'description': description,
+            'start': {
+                'dateTime': start_time.isoformat(),
+                'timeZone': timezone,
+            },
+            'end': {
+                'dateTime': end_time.isoformat(),
+                'timeZone': timezone,
+            },
+        }
+
+        # Add color if specified
+        if color_id:
+            event['colorId'] = color_id
+
+        # Add reminders
+        if reminders:
+            event['reminders'] = reminders
+        else:
+            event['reminders'] = {
+                'useDefault': False,
+                'overrides': [
+                    {'method': 'email', 'minutes': 24 * 60},
+                    {'method': 'popup', 'minutes': 10},
+                ],
+            }
+
+        # Add extended properties for metadata
+        if extended_properties:
+            event['extendedProperties'] = extended_properties
+
+        return event
+
     def create_event(self, summary, start_time, end_time, description='', location='', 
                     calendar_id='primary', timezone='UTC', color_id=None, 
                     reminders=None, extended_properties=None):
         """Create a new event"""
         try:
-            event = {
-                'summary': summary,
-                'location': location,
-                'description': description,
-                'start': {
-                    'dateTime': start_time.isoformat(),
-                    'timeZone': timezone,
-                },
-                'end': {
-                    'dateTime': end_time.isoformat(),
-                    'timeZone': timezone,
-                },
-            }
-            
-            # Add color if specified
-            if color_id:
-                event['colorId'] = color_id
-            
-            # Add reminders
-            if reminders:
-                event['reminders'] = reminders
-            else:
-                event['reminders'] = {
-                    'useDefault': False,
-                    'overrides': [
-                        {'method': 'email', 'minutes': 24 * 60},
-                        {'method': 'popup', 'minutes': 10},
-                    ],
-                }
-            
-            # Add extended properties for metadata
-            if extended_properties:
-                event['extendedProperties'] = extended_properties
-
-            created_event = self.service.events().insert(
+            event = self._build_event_body(
+                summary, start_time, end_time, description=description,
+                location=location, timezone=timezone, color_id=color_id,
+                reminders=reminders, extended_properties=extended_properties)
+            event['id'] = _new_event_id()
+
+            created_event = _exec_with_backoff(self.service.events().insert(
                 calendarId=calendar_id, 
                 body=event
-            ).execute()
+            ))
 
-            print(f'Event created: {event.get("htmlLink", created_event.get("id"))}')
             return created_event
+        except HttpError as error:
+            # A retried insert that had already gone through
+            if _is_conflict(error):
+                return event
+            logger.error('An error occurred creating event: %s', error)
+            return None
         except Exception as error:
-            print(f'An error occurred creating event: {error}')
+            logger.error('An error occurred creating event: %s', error)
             return None
 
     def update_event(self, event_id, calendar_id='primary', **kwargs):
         """Update an existing event"""
         try:
             # Get the existing event
-            event = self.service.events().get(
+            event = _exec_with_backoff(self.service.events().get(
                 calendarId=calendar_id, 
                 eventId=event_id
-            ).execute()
+            ))
 
             # Update fields
             for key, value in kwargs.items():
@@ -195,30 +651,29 @@ class GoogleCalendarAPI:
                 elif key == 'end_time':
                     event['end']['dateTime'] = value.isoformat()
 
-            updated_event = self.service.events().update(
+            updated_event = _exec_with_backoff(self.service.events().update(
                 calendarId=calendar_id,
                 eventId=event_id,
                 body=event
-            ).execute()
+            ))
 
-            print(f'Event updated: {updated_event.get("htmlLink")}')
+            logger.debug('Event updated: %s', updated_event.get('htmlLink'))
             return updated_event
         except Exception as error:
-            print(f'An error occurred updating event: {error}')
+            logger.error('An error occurred updating event: %s', error)
             return None
 
     def delete_event(self, event_id, calendar_id='primary'):
         """Delete an event"""
         try:
-            self.service.events().delete(
+            _exec_with_backoff(self.service.events().delete(
                 calendarId=calendar_id,
                 eventId=event_id
-            ).execute()
+            ))
 
-            print(f'Event deleted successfully: {event_id}')
             return True
         except Exception as error:
-            print(f'Error deleting event {event_id}: {error}')
+            logger.error('Error deleting event %s: %s', event_id, error)
             return False
 
     def search_events(self, query, calendar_id='primary', max_results=10):
@@ -229,46 +684,241 @@ class GoogleCalendarAPI:
                 q=query,
                 maxResults=max_results,
                 singleEvents=True,
-                orderBy='startTime'
+                orderBy='startTime',
+                fields=self.LIST_FIELDS
             ).execute()
 
             events = events_result.get('items', [])
 
-            print(f'Found {len(events)} events matching "{query}":')
-            for event in events:
-                start = event['start'].get('dateTime', event['start'].get('date'))
-                print(f"- {event['summary']} ({start})")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug('Found %d events matching "%s":', len(events), query)
+                for event in events:
+                    start = event['start'].get('dateTime', event['start'].get('date'))
+                    logger.debug('- %s (%s)', event['summary'], start)
 
             return events
         except Exception as error:
-            print(f'An error occurred searching events: {error}')
+            logger.error('An error occurred searching events: %s', error)
             return None
 
-    def get_events_for_date(self, events, target_date):
-        """Filter events that occur on a specific date"""
-        events_on_date = []
-        target_date_str = target_date.strftime('%Y-%m-%d')
-        
-        for event in events:
-            event_start = event['start'].get('dateTime', event['start'].get('date'))
-            if event_start.startswith(target_date_str):
-                events_on_date.append(event)
-        
-        return events_on_date
+    def index_events_by_date(self, events, tzinfo=None):
+        """Index events by start date, for `get_events_for_date`"""
+        return _index_events_by_date(events, tzinfo)
+
+    def get_events_for_date(self, events, target_date, index=None):
+        """Filter events that occur on a specific date.
+
+        Pass an index built by `index_events_by_date` to avoid re-scanning
+        the events list when filtering for several dates.
+        """
+        if index is None:
+            index = _index_events_by_date(events)
 
-    def delete_events_on_date(self, calendar_id, target_date, events=None):
+        return index.get(target_date.strftime('%Y-%m-%d'), [])
+
+    def delete_events_on_date(self, calendar_id, target_date, events=None, index=None):
         """Delete all events on a specific date"""
-        if events is None:
+        if events is None and index is None:
             # Get events for the day
             start_of_day = target_date.replace(hour=0, minute=0, second=0, microsecond=0)
             end_of_day = start_of_day + timedelta(days=1)
             events = self.get_events_in_range(calendar_id, start_of_day, end_of_day)
         
-        events_on_date = self.get_events_for_date(events, target_date)
+        events_on_date = self.get_events_for_date(events, target_date, index=index)
         
+        return self.batch_delete_events(
+            [(event['id'], calendar_id) for event in events_on_date])
+
+    def _execute_in_batches(self, requests, callback):
+        """Execute (request_id, request) pairs in batches of BATCH_SIZE"""
+        chunk = []
+        for request_id, request in requests:
+            chunk.append((request_id, request))
+            if len(chunk) == self.BATCH_SIZE:
+                self._execute_batch(chunk, callback)
+                chunk = []
+
+        if chunk:
+            self._execute_batch(chunk, callback)
+
+    def _execute_batch(self, chunk, callback):
+        """Execute one batch, sending its requests concurrently if the batch fails.
+
+        Requests failing in the batch with a rate-limit or server error are
+        resent individually, with backoff, instead of being reported failed.
+        """
+        retry_ids = set()
+
+        def batch_callback(request_id, response, exception):
+            if isinstance(exception, HttpError) and _is_retryable(exception):
+                retry_ids.add(request_id)
+            else:
+                callback(request_id, response, exception)
+
+        batch = self.service.new_batch_http_request(callback=batch_callback)
+        for request_id, request in chunk:
+            batch.add(request, request_id=request_id)
+
+        try:
+            batch.execute()
+        except (HttpError, *TRANSPORT_ERRORS) as error:
+            # Handled per chunk, so that the next chunks still go out
+            logger.warning('Batch request failed (%s), sending %d requests individually',
+                           error, len(chunk))
+            self._execute_concurrently(chunk, callback)
+            return
+
+        if retry_ids:
+            logger.warning('Retrying %d requests of the batch individually', len(retry_ids))
+            self._execute_concurrently(
+                [(request_id, request) for request_id, request in chunk
+                 if request_id in retry_ids],
+                callback)
+
+    def _execute_concurrently(self, requests, callback, workers=8, max_rate=10):
+        """Execute (request_id, request) pairs from a thread pool.
+
+        Reports each result through `callback(request_id, response, exception)`
+        like a batch would, sending at most `max_rate` requests per second.
+        """
+        limiter = _RateLimiter(max_rate)
+
+        def execute(request):
+            limiter.acquire()
+            return _exec_with_backoff(request, http=self._thread_http())
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(execute, request): request_id
+                for request_id, request in requests
+            }
+            for future in as_completed(futures):
+                try:
+                    response = future.result()
+                except Exception as error:
+                    callback(futures[future], None, error)
+                else:
+                    callback(futures[future], response, None)
+
+    def batch_delete_events(self, pairs):
+        """Delete (event_id, calendar_id) pairs using batch requests"""
+        pairs = list(pairs)
         deleted_count = 0
-        for event in events_on_date:
-            if self.delete_event(event['id'], calendar_id):
+
+        def callback(request_id, response, exception):
+            nonlocal deleted_count
+            # 410 Gone: a resent delete that had already gone through
+            if exception is not None and not (
+                    isinstance(exception, HttpError) and exception.resp.status == 410):
+                event_id = pairs[int(request_id)][0]
+                logger.error('Error deleting event %s: %s', event_id, exception)
+            else:
                 deleted_count += 1
-        
+
+        try:
+            self._execute_in_batches(
+                ((str(i), self.service.events().delete(calendarId=calendar_id, eventId=event_id))
+                 for i, (event_id, calendar_id) in enumerate(pairs)),
+                callback)
+        except Exception as error:
+            logger.error('An error occurred executing delete batch: %s', error)
+
+        logger.info('Deleted %d/%d events', deleted_count, len(pairs))
+        return deleted_count
+
+    def batch_create_events(self, specs):
+        """Create events using batch requests.
+
+        Each spec is a dict of `create_event` keyword arguments. Returns the
+        created events, in the same order as the specs (None for failures).
+        """
+        specs = list(specs)
+        created_events = [None] * len(specs)
+        bodies = [None] * len(specs)
+
+        def callback(request_id, response, exception):
+            if _is_conflict(exception):
+                # A resent insert that had already gone through
+                created_events[int(request_id)] = bodies[int(request_id)]
+            elif exception is not None:
+                summary = specs[int(request_id)].get('summary')
+                logger.error('An error occurred creating event %s: %s', summary, exception)
+            else:
+                created_events[int(request_id)] = response
+
+        def build_requests():
+            for i, spec in enumerate(specs):
+                spec = dict(spec)
+                calendar_id = spec.pop('calendar_id', 'primary')
+                body = self._build_event_body(**spec)
+                body['id'] = _new_event_id()
+                bodies[i] = body
+                yield str(i), self.service.events().insert(
+                    calendarId=calendar_id, body=body)
+
+        try:
+            self._execute_in_batches(build_requests(), callback)
+        except Exception as error:
+            logger.error('An error occurred executing create batch: %s', error)
+
+        created_count = sum(1 for event in created_events if event is not None)
+        logger.info('Created %d/%d events', created_count, len(specs))
+        return created_events
+
+    def batch_patch_events(self, patches):
+        """Patch events using batch requests.
+
+        Each patch is an (event_id, spec) pair, spec being a dict of
+        `create_event` keyword arguments. Returns the patched events, in
+        order (None for failures).
+        """
+        patches = list(patches)
+        patched_events = [None] * len(patches)
+
+        def callback(request_id, response, exception):
+            if exception is not None:
+                event_id = patches[int(request_id)][0]
+                logger.error('An error occurred patching event %s: %s', event_id, exception)
+            else:
+                patched_events[int(request_id)] = response
+
+        def build_requests():
+            for i, (event_id, spec) in enumerate(patches):
+                spec = dict(spec)
+                calendar_id = spec.pop('calendar_id', 'primary')
+                body = self._build_event_body(**spec)
+                yield str(i), self.service.events().patch(
+                    calendarId=calendar_id, eventId=event_id, body=body)
+
+        try:
+            self._execute_in_batches(build_requests(), callback)
+        except Exception as error:
+            logger.error('An error occurred executing patch batch: %s', error)
+
+        patched_count = sum(1 for event in patched_events if event is not None)
+        logger.info('Patched %d/%d events', patched_count, len(patches))
+        return patched_events
+
+    def bulk_delete(self, pairs, workers=8, max_rate=10):
+        """Delete (event_id, calendar_id) pairs concurrently.
+
+        Fallback for when batch requests can't be used: each worker thread
+        sends individual deletes, at most `max_rate` requests per second overall.
+        """
+        pairs = list(pairs)
+        deleted_count = 0
+
+        def callback(request_id, response, exception):
+            nonlocal deleted_count
+            if exception is not None:
+                logger.error('Error deleting event %s: %s', pairs[int(request_id)][0], exception)
+            else:
+                deleted_count += 1
+
+        self._execute_concurrently(
+            [(str(i), self.service.events().delete(calendarId=calendar_id, eventId=event_id))
+             for i, (event_id, calendar_id) in enumerate(pairs)],
+            callback, workers=workers, max_rate=max_rate)
+
+        logger.info('Deleted %d/%d events', deleted_count, len(pairs))
         return deleted_count
\ No newline at end of file
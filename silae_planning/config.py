@@ -3,6 +3,7 @@ Configuration module for managing secrets and settings.
 Uses environment variables for security.
 """
 
+import functools
 import os
 from pathlib import Path
 
@@ -36,9 +37,11 @@ class Config:
             "GOOGLE_CREDENTIALS_FILE", "credentials/google_credentials.json"
         )
         self.GOOGLE_TOKEN_FILE = os.getenv(
-            "GOOGLE_TOKEN_FILE", "credentials/token.pickle"
+            "GOOGLE_TOKEN_FILE", "credentials/token.json"
         )
         self.HOTEL_CALENDAR_ID = os.getenv("HOTEL_CALENDAR_ID")
+        # Opt-in: only worth it when the file persists between runs
+        self.CALENDAR_SYNC_STATE_FILE = os.getenv("CALENDAR_SYNC_STATE_FILE")
 
         # App settings
         self.TIMEZONE = os.getenv("TIMEZONE", "Europe/Paris")
@@ -72,6 +75,18 @@ class Config:
         """Get the full path to Google token file"""
         return os.path.abspath(self.GOOGLE_TOKEN_FILE)
 
+    def get_sync_state_path(self):
+        """Get the full path to the calendar sync state, None if not enabled"""
+        if not self.CALENDAR_SYNC_STATE_FILE:
+            return None
+        return os.path.abspath(self.CALENDAR_SYNC_STATE_FILE)
+
+    def get_silae_cookies_path(self) -> str:
+        """Get the full path to the cached Silae cookies, next to the token file"""
+        return os.path.join(
+            os.path.dirname(self.get_token_path()), "silae_cookies.json"
+        )
+
     def ensure_credentials_dir(self):
         """Ensure the credentials directory exists"""
         cred_dir = Path(self.GOOGLE_CREDENTIALS_FILE).parent
@@ -81,5 +96,7 @@ class Config:
         token_dir.mkdir(exist_ok=True)
 
 
-# Global config instance
-config = Config()
+@functools.lru_cache(maxsize=1)
+def get_config() -> Config:
+    """Get the shared config instance, created on first use"""
+    return Config()
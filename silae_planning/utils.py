@@ -1,53 +1,163 @@
+import functools
 import json
 import logging
 import os
 import requests
-from dateutil import parser
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import re
+from collections import defaultdict
 from datetime import datetime, timedelta
 
+# urllib3 ne sait décoder les réponses "br" que si brotli est installé
+try:
+    import brotli  # noqa: F401
+
+    _ACCEPT_ENCODING = "gzip, br"
+except ImportError:
+    _ACCEPT_ENCODING = "gzip"
+
+# orjson est bien plus rapide que json, dont il reprend JSONDecodeError
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Token CSRF du formulaire de connexion
+_CSRF_RE = re.compile(r'name="_csrf_token"[^>]*value="([^"]*)"')
+# Nom de fuseau devant l'offset: '2025-10-22 10:30 CEST+0200'
+_TZ_RE = re.compile(r"\s+[A-Z]{3,4}([\+\-]\d{4})")
+# Formats d'horodatage Silae une fois le nom de fuseau retiré
+_SILAE_TIME_FORMATS = ("%Y-%m-%d %H:%M%z", "%Y-%m-%d %H:%M %z")
+# Durée Silae au format "9h00", "7h", "0h45"
+_DURATION_RE = re.compile(r"(\d*)h(\d{0,2})")
+
+# Headers complets basés sur la capture réseau, envoyés avec chaque requête
+SESSION_HEADERS = {
+    "Accept-Language": "en-US,en;q=0.9,fr;q=0.8,vi;q=0.7,fr-FR;q=0.6",
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0",
+    "sec-ch-ua": '"Microsoft Edge";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
+    "sec-ch-ua-mobile": "?0",
+    "sec-ch-ua-platform": '"Windows"',
+}
+
+# Headers des requêtes AJAX du planning (endpoints JSON)
+JSON_HEADERS = {
+    "Accept": "application/json, text/javascript, */*; q=0.01",
+    "Accept-Encoding": _ACCEPT_ENCODING,
+    "X-Requested-With": "XMLHttpRequest",  # Important pour les requêtes AJAX
+    "Sec-Fetch-Dest": "empty",
+    "Sec-Fetch-Mode": "cors",
+    "Sec-Fetch-Site": "same-origin",
+}
+
+_silae_adapter = None
+
+
+def new_silae_session():
+    """
+    Crée une session HTTP pour Silae (cookies propres à chaque connexion),
+    sur un pool de connexions partagé (keep-alive + retries)
+    """
+    # Les appels Silae sont séquentiels (connexion puis planning) : le
+    # keep-alive HTTP/1.1 du pool réutilise déjà une seule connexion TLS,
+    # HTTP/2 n'apporterait que du multiplexage de requêtes concurrentes
+    global _silae_adapter
+    if _silae_adapter is None:
+        _silae_adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.3,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False,
+            ),
+        )
+    session = requests.Session()
+    session.mount("https://", _silae_adapter)
+    session.headers.update(SESSION_HEADERS)
+    return session
+
 
 class SilaeSession:
     def __init__(
-        self, username, password, base_url=None, verify_ssl=True, ca_bundle=None
+        self,
+        username,
+        password,
+        base_url=None,
+        verify_ssl=True,
+        ca_bundle=None,
+        cookies_file=None,
     ):
         if base_url is None:
             base_url = "https://user.fiteco.rhsuite.silae.fr"
-        login_url = f"{base_url}/login"
+        self.username = username
+        self.password = password
+        self.base_url = base_url
+        self.verify_ssl = verify_ssl
+        self.ca_bundle = ca_bundle
+        self.cookies_file = cookies_file
+        self.session = None
+        self.restored = False
+        # Réutiliser les cookies du dernier run tant que la session est valide
+        if cookies_file:
+            self.session = restore_silae_session(
+                cookies_file, base_url, verify_ssl=verify_ssl, ca_bundle=ca_bundle
+            )
+            self.restored = self.session is not None
+        if self.session is None:
+            self._login()
+        self._save_cookies()
+
+    def _login(self):
+        self.restored = False
         self.session = login_silae_portal(
-            username,
-            password,
-            login_url,
-            verify_ssl=verify_ssl,
-            ca_bundle=ca_bundle,
+            self.username,
+            self.password,
+            f"{self.base_url}/login",
+            verify_ssl=self.verify_ssl,
+            ca_bundle=self.ca_bundle,
         )
-        self.base_url = base_url
+
+    def _save_cookies(self):
+        # Silae peut renouveler ses cookies à chaque réponse : les réenregistrer
+        if self.session is not None and self.cookies_file:
+            save_silae_cookies(self.session, self.cookies_file)
+
+    def _fetch(self, fetch, *args):
+        result = fetch(self.session, *args)
+        # Cookies restaurés refusés malgré la vérification : oublier le cache,
+        # se reconnecter et réessayer une fois
+        if result is None and self.restored:
+            logger.info("Session Silae restaurée refusée, nouvelle connexion")
+            if os.path.exists(self.cookies_file):
+                os.remove(self.cookies_file)
+            self._login()
+            if self.session is not None:
+                result = fetch(self.session, *args)
+        self._save_cookies()
+        return result
 
     def get_planning_events(self, date_from=None, date_to=None, view="timelineWeek"):
         """
         Get planning events for a date range, default from today to next 6 days
         """
-        return get_planning_events(
-            self.session, date_from, date_to, view, self.base_url
+        return self._fetch(
+            get_planning_events, date_from, date_to, view, self.base_url
         )
 
     def get_planning_resources(self):
-        return get_planning_resources(self.session, self.base_url)
+        return self._fetch(get_planning_resources, self.base_url)
 
 
-def login_silae_portal(
-    username,
-    password,
-    login_url=None,
-    verify_ssl=True,
-    ca_bundle=None,
-):
-    session = requests.Session()
-
+def _configure_ssl(session, verify_ssl=True, ca_bundle=None):
     # Configure SSL verification once at session level.
     # - verify_ssl=True + ca_bundle set: use custom CA bundle
     # - verify_ssl=True + no ca_bundle: use system cert store
@@ -64,6 +174,95 @@ def login_silae_portal(
     else:
         session.verify = bool(verify_ssl)
 
+
+def save_silae_cookies(session, cookies_file):
+    """
+    Enregistre les cookies de la session en JSON, lisible par le seul propriétaire
+    """
+    cookies = [
+        {
+            "name": cookie.name,
+            "value": cookie.value,
+            "domain": cookie.domain,
+            "path": cookie.path,
+            "secure": cookie.secure,
+            "expires": cookie.expires,
+        }
+        for cookie in session.cookies
+    ]
+    try:
+        fd = os.open(cookies_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, "w") as f:
+            json.dump(cookies, f)
+    except OSError as exc:
+        logger.warning("Impossible d'enregistrer les cookies Silae: %s", exc)
+
+
+def restore_silae_session(
+    cookies_file, base_url=None, verify_ssl=True, ca_bundle=None
+):
+    """
+    Recharge les cookies enregistrés et vérifie que la session Silae est encore
+    valide. Retourne None si une nouvelle connexion est nécessaire.
+    """
+    if base_url is None:
+        base_url = "https://user.fiteco.rhsuite.silae.fr"
+    try:
+        with open(cookies_file) as f:
+            cookies = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    session = new_silae_session()
+    _configure_ssl(session, verify_ssl, ca_bundle)
+    for cookie in cookies:
+        session.cookies.set(
+            cookie["name"],
+            cookie["value"],
+            domain=cookie["domain"],
+            path=cookie["path"],
+            secure=cookie["secure"],
+            expires=cookie["expires"],
+        )
+
+    # Session expirée: Silae redirige vers /login (ou répond 401). Vérifier
+    # sur l'endpoint JSON du planning utilisé ensuite, limité à un jour
+    today = datetime.now().strftime("%Y-%m-%d")
+    try:
+        response = session.get(
+            f"{base_url}/planning/json/employee/events",
+            params={"from": today, "to": today, "view": "timelineDay"},
+            headers={**JSON_HEADERS, "Referer": f"{base_url}/planning/mon-planning"},
+            allow_redirects=False,
+        )
+    except requests.exceptions.RequestException as exc:
+        logger.debug("Vérification de la session Silae impossible: %s", exc)
+        return None
+
+    if response.status_code != 200:
+        logger.debug("Session Silae expirée: %s", response.status_code)
+        return None
+    try:
+        _json_loads(response.content)
+    except json.JSONDecodeError:
+        logger.debug("Session Silae expirée: réponse non JSON")
+        return None
+
+    logger.info("Session Silae restaurée depuis les cookies enregistrés")
+    return session
+
+
+def login_silae_portal(
+    username,
+    password,
+    login_url=None,
+    verify_ssl=True,
+    ca_bundle=None,
+):
+    # Nouvelle connexion: nouvelle session, avec un jar de cookies vide
+    session = new_silae_session()
+    _configure_ssl(session, verify_ssl, ca_bundle)
+
     if login_url is None:
         login_url = "https://user.fiteco.rhsuite.silae.fr/login"
     logger.info(f"Login URL: {login_url} with username: {username}")
@@ -82,8 +281,7 @@ def login_silae_portal(
 
     # Utiliser regex pour extraire le token CSRF au lieu de BeautifulSoup
     csrf_token = None
-    csrf_pattern = r'name="_csrf_token"[^>]*value="([^"]*)"'
-    match = re.search(csrf_pattern, response.text)
+    match = _CSRF_RE.search(response.text)
     if match:
         csrf_token = match.group(1)
 
@@ -134,38 +332,24 @@ def get_planning_events(
         "view": view,  # timelineWeek, timelineDay, month, etc.
     }
 
-    # Headers complets basés sur la capture réseau
     headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "Accept-Language": "en-US,en;q=0.9,fr;q=0.8,vi;q=0.7,fr-FR;q=0.6",
-        "X-Requested-With": "XMLHttpRequest",  # Important pour les requêtes AJAX
+        **JSON_HEADERS,
         "Referer": f"{base_url}/planning/mon-planning",
-        "Referer": f"{base_url}/planning/mon-planning",
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36 Edg/141.0.0.0",
-        "sec-ch-ua": '"Microsoft Edge";v="141", "Not?A_Brand";v="8", "Chromium";v="141"',
-        "sec-ch-ua-mobile": "?0",
-        "sec-ch-ua-platform": '"Windows"',
-        "Sec-Fetch-Dest": "empty",
-        "Sec-Fetch-Mode": "cors",
-        "Sec-Fetch-Site": "same-origin",
     }
 
-    # Ajouter les headers à la session
-    session.headers.update(headers)
-
     logger.debug(f"\n=== Récupération des événements ===")
     logger.debug(f"Période: {date_from} à {date_to}")
     logger.debug(f"Vue: {view}")
 
     # Faire la requête
-    response = session.get(url, params=params)
+    response = session.get(url, params=params, headers=headers)
 
     logger.debug(f"Status: {response.status_code}")
     logger.debug(f"URL complète: {response.url}")
 
     if response.status_code == 200:
         try:
-            data = response.json()
+            data = _json_loads(response.content)
             logger.debug(
                 f"✓ Données récupérées: {len(data) if isinstance(data, list) else 'objet JSON'}"
             )
@@ -180,12 +364,24 @@ def get_planning_events(
         return None
 
 
+# Les mêmes horodatages reviennent d'un shift à l'autre (datetime immuables)
+@functools.lru_cache(maxsize=512)
 def parse_silae_time(time_str):
     """Parse Silae time format like '2025-10-22 10:30 CEST+0200'"""
 
     # Remove timezone name (CEST, CET, etc.) and keep only offset
     # '2025-10-22 10:30 CEST+0200' -> '2025-10-22 10:30 +0200'
-    cleaned = re.sub(r"\s+[A-Z]{3,4}([\+\-]\d{4})", r" \1", time_str)
+    cleaned = _TZ_RE.sub(r" \1", time_str)
+
+    # strptime sur les formats connus, dateutil en dernier recours
+    for time_format in _SILAE_TIME_FORMATS:
+        try:
+            return datetime.strptime(cleaned, time_format)
+        except ValueError:
+            pass
+    # dateutil n'est importé que si un format inconnu se présente
+    from dateutil import parser
+
     return parser.parse(cleaned)
 
 
@@ -201,18 +397,15 @@ def get_planning_resources(session, base_url=None):
     url = f"{base_url}/planning/json/resources"
 
     headers = {
-        "Accept": "application/json, text/javascript, */*; q=0.01",
-        "X-Requested-With": "XMLHttpRequest",
-        "Referer": f"{base_url}/planning/mon-planning",
+        **JSON_HEADERS,
         "Referer": f"{base_url}/planning/mon-planning",
     }
 
-    session.headers.update(headers)
-    response = session.get(url)
+    response = session.get(url, headers=headers)
 
     if response.status_code == 200:
         try:
-            return response.json()
+            return _json_loads(response.content)
         except json.JSONDecodeError:
             logger.debug("Erreur de décodage JSON pour les ressources")
             return None
@@ -226,8 +419,10 @@ def get_employee_map(resources):
     employee_map = {}
     for res in resources:
         if res.get("type") == "employee":
+            name = res.get("text")
             employee_map[res.get("id")] = {
-                "name": res.get("text"),
+                "name": name,
+                "name_lower": (name or "").lower(),
                 "firstname": res.get("firstname"),
                 "lastname": res.get("lastname"),
                 "function": res.get("function", {}).get("label"),
@@ -237,26 +432,36 @@ def get_employee_map(resources):
     return employee_map
 
 
-def find_employee_by_name(resources, search_name):
-    """Trouve un employé par nom (recherche partielle, insensible à la casse)"""
-    employee_map = get_employee_map(resources)
-    search_name_lower = search_name.lower()
+def find_employee_by_name(employee_map, search_name):
+    """
+    Trouve un employé par nom (recherche partielle, insensible à la casse)
 
-    matches = []
-    for emp_id, emp_info in employee_map.items():
-        if search_name_lower in emp_info["name"].lower():
-            matches.append({"id": emp_id, **emp_info})
+    employee_map est le résultat de get_employee_map, à construire une seule
+    fois pour des recherches répétées
+    """
+    search_name_lower = search_name.lower()
 
-    return matches
+    return [
+        {"id": emp_id, **emp_info}
+        for emp_id, emp_info in employee_map.items()
+        if search_name_lower in emp_info["name_lower"]
+    ]
 
 
-def get_employee_shifts(events, employee_id, week_start=None, week_end=None):
-    """Récupère les shifts d'un employé pour une période donnée"""
+def get_employee_shifts(
+    events, employee_id, week_start=None, week_end=None, event_type=None
+):
+    """Récupère les shifts d'un employé pour une période donnée (et un type)"""
     # Convertir l'ID en string pour la comparaison
     employee_id_str = str(employee_id)
 
-    # Filtrer les événements de cet employé
-    employee_events = [e for e in events if str(e.get("employee")) == employee_id_str]
+    # Filtrer les événements de cet employé (et du type demandé) en une passe
+    employee_events = [
+        e
+        for e in events
+        if str(e.get("employee")) == employee_id_str
+        and (event_type is None or e.get("type") == event_type)
+    ]
 
     # Filtrer par date si spécifié
     if week_start and week_end:
@@ -270,6 +475,19 @@ def get_employee_shifts(events, employee_id, week_start=None, week_end=None):
     return employee_events
 
 
+def group_events_by_employee(events):
+    """Regroupe les événements par ID d'employé (en str) en une seule passe"""
+    events_by_employee = defaultdict(list)
+    for event in events:
+        events_by_employee[str(event.get("employee"))].append(event)
+    return events_by_employee
+
+
+def _time_of(timestamp):
+    """Extrait l'heure d'un horodatage Silae ('2025-10-22 10:30 CEST+0200' -> '10:30')"""
+    return timestamp.partition(" ")[2].partition(" ")[0]
+
+
 def format_shift(event):
     """Formate un événement en une représentation lisible"""
     event_type = event.get("type")
@@ -280,16 +498,16 @@ def format_shift(event):
     duration = event.get("durationText")
     break_time = event.get("breakTime")
 
-    # Parser la date et les heures
+    # Parser la date et les heures ('2026-04-17 23:00+02:00')
     if start:
-        date_str = start.split()[0]
-        time_start = start.split()[1]
+        date_str, _, time_start = start.partition(" ")
+        time_start = time_start.partition(" ")[0]
     else:
         date_str = "N/A"
         time_start = "N/A"
 
     if end:
-        time_end = end.split()[1]
+        time_end = _time_of(end)
     else:
         time_end = "N/A"
 
@@ -308,9 +526,9 @@ def format_shift(event):
         break_start = event.get("breakTimeStart", "")
         break_end = event.get("breakTimeEnd", "")
         if break_start:
-            break_start = break_start.split()[1]
+            break_start = _time_of(break_start)
         if break_end:
-            break_end = break_end.split()[1]
+            break_end = _time_of(break_end)
         result["break_start"] = break_start
         result["break_end"] = break_end
 
@@ -319,16 +537,15 @@ def format_shift(event):
 
 def calculate_total_hours(events):
     """Calcule le total d'heures travaillées"""
-    work_events = [e for e in events if e.get("type") == "WORK"]
-
-    total_minutes = 0
-    for event in work_events:
-        duration_text = event.get("durationText", "0h")
-        if "h" in duration_text:
-            parts = duration_text.replace("h", ":").split(":")
-            hours = int(parts[0]) if parts[0] else 0
-            minutes = int(parts[1]) if len(parts) > 1 and parts[1] else 0
-            total_minutes += hours * 60 + minutes
+    # durationText est travaillé hors pause ("9h00"), contrairement à
+    # minutesCount qui inclut la pause : on ne peut pas s'appuyer dessus
+    total_minutes = sum(
+        int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+        for event in events
+        if event.get("type") == "WORK"
+        for match in [_DURATION_RE.match(event.get("durationText") or "")]
+        if match
+    )
 
     total_hours = total_minutes // 60
     total_mins = total_minutes % 60
@@ -336,9 +553,17 @@ def calculate_total_hours(events):
     return f"{total_hours}h{total_mins:02d}"
 
 
-def display_employee_schedule(employee_id, events, resources):
-    """Affiche le planning d'un employé"""
-    employee_map = get_employee_map(resources)
+def display_employee_schedule(
+    employee_id, events, resources=None, employee_map=None, events_by_employee=None
+):
+    """
+    Affiche le planning d'un employé
+
+    Pour afficher plusieurs employés, construire une seule fois employee_map
+    (get_employee_map) et events_by_employee (group_events_by_employee)
+    """
+    if employee_map is None:
+        employee_map = get_employee_map(resources)
     employee = employee_map.get(employee_id, {})
     if not employee:
         logger.info(f"❌ Aucun employé trouvé avec id '{employee_id}'")
@@ -353,7 +578,10 @@ def display_employee_schedule(employee_id, events, resources):
     logger.info("")
 
     # Récupérer les shifts
-    shifts = get_employee_shifts(events, employee_id)
+    if events_by_employee is not None:
+        shifts = events_by_employee.get(str(employee_id), [])
+    else:
+        shifts = get_employee_shifts(events, employee_id)
 
     if not shifts:
         logger.info("❌ Aucun shift trouvé pour cette période")
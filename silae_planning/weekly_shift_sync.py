@@ -4,34 +4,61 @@ Runs every Sunday to sync Silae shifts with Google Calendar for the next 4 weeks
 """
 
 import sys
+import hashlib
 import logging
-from datetime import datetime, timedelta
-import pytz
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
 
-from config import config
+from config import get_config
 from utils import (
-    get_planning_events,
     get_employee_shifts,
     parse_silae_time,
     SilaeSession,
 )
-from calendar_api import GoogleCalendarAPI
 
+# Event fields read back by the sync: matching, hashing and date indexing
+EXISTING_EVENT_FIELDS = (
+    "items(id,summary,start(dateTime,date),end(dateTime,date),"
+    "extendedProperties/private),nextPageToken"
+)
 
-logging.basicConfig(
-    level=getattr(logging, config.LOG_LEVEL),
-    format="%(asctime)s - %(levelname)s - %(message)s",
+# Shift fields rendered into the calendar event, hashed to detect changes
+SHIFT_HASH_FIELDS = (
+    "label",
+    "code",
+    "start",
+    "end",
+    "durationText",
+    "siteName",
+    "breakTime",
+    "description",
 )
 
 
+def shift_hash(shift):
+    """Hash the shift content that ends up in its calendar event."""
+    content = "|".join(str(shift.get(field, "")) for field in SHIFT_HASH_FIELDS)
+    return hashlib.sha1(content.encode("utf-8")).hexdigest()
+
+
 class WeeklyShiftSync:
     def __init__(self):
         """Initialize the sync service using configuration."""
+        config = get_config()
+        logging.basicConfig(
+            level=getattr(logging, config.LOG_LEVEL),
+            format="%(asctime)s - %(levelname)s - %(message)s",
+        )
         config.ensure_credentials_dir()
+        self.config = config
+
+        # googleapiclient is slow to import, only load it once configured
+        from calendar_api import GoogleCalendarAPI
 
         self.calendar_api = GoogleCalendarAPI(
             credentials_file=config.get_credentials_path(),
             token_file=config.get_token_path(),
+            sync_state_file=config.get_sync_state_path(),
         )
 
         self.hotel_calendar_id = config.HOTEL_CALENDAR_ID
@@ -40,37 +67,30 @@ class WeeklyShiftSync:
         self.employee_id = config.EMPLOYEE_ID
         self.base_url = config.SILAE_BASE_URL
 
-        self.timezone = pytz.timezone(config.TIMEZONE)
+        self.timezone = ZoneInfo(config.TIMEZONE)
         self.logger = logging.getLogger(__name__)
 
     def get_next_4_week_dates(self):
         """Get date range from today to 27 days later (4-week window)."""
-        today = datetime.now()
-        end_date = today + timedelta(days=27)
-        return today.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        today = date.today()
+        return today, today + timedelta(days=27)
 
     def get_existing_calendar_events(self, start_date, end_date):
         """Get existing events in the hotel calendar for the date range."""
         return self.calendar_api.get_events_in_range(
-            self.hotel_calendar_id, start_date, end_date
+            self.hotel_calendar_id, start_date, end_date, fields=EXISTING_EVENT_FIELDS
         )
 
-    def delete_calendar_event(self, event_id):
-        """Delete a calendar event."""
-        success = self.calendar_api.delete_event(event_id, self.hotel_calendar_id)
-        if success:
-            self.logger.info(f"Deleted existing calendar event: {event_id}")
-        return success
-
-    def create_calendar_event(self, shift):
-        """Create a calendar event from a Silae shift."""
-        start_time = parse_silae_time(shift["start"])
-        end_time = parse_silae_time(shift["end"])
-
-        if not start_time or not end_time:
-            self.logger.error(f"Failed to parse times for shift {shift.get('id')}")
-            return None
+    def delete_calendar_events(self, event_ids):
+        """Delete calendar events with batch requests."""
+        deleted_count = self.calendar_api.batch_delete_events(
+            (event_id, self.hotel_calendar_id) for event_id in event_ids
+        )
+        self.logger.info("Deleted %d existing calendar events", deleted_count)
+        return deleted_count
 
+    def build_calendar_event(self, shift, start_time, end_time):
+        """Build the create_event arguments for a Silae shift and its parsed times."""
         description = f"""
 Shift Details:
 - Code: {shift['code']} ({shift['label']})
@@ -91,38 +111,67 @@ Shift Details:
             "private": {
                 "silae_shift_id": str(shift["id"]),
                 "silae_shift_code": shift["code"],
+                "employee_id": str(shift["employee"]),
+                "silae_hash": shift_hash(shift),
                 "sync_script": "weekly_shift_sync",
             }
         }
 
-        created_event = self.calendar_api.create_event(
+        return dict(
             summary=shift["label"],
             start_time=start_time,
             end_time=end_time,
             description=description,
             location=shift["siteName"],
             calendar_id=self.hotel_calendar_id,
-            timezone=config.TIMEZONE,
+            timezone=self.config.TIMEZONE,
             color_id="1",
             reminders=reminders,
             extended_properties=extended_properties,
         )
 
-        if created_event:
-            self.logger.info(
-                f'Created calendar event: {shift["label"]} on {start_time.strftime("%Y-%m-%d %H:%M")}'
-            )
+    def create_calendar_events(self, event_specs):
+        """Create calendar events with batch requests."""
+        created_events = self.calendar_api.batch_create_events(event_specs)
+        for spec, created_event in zip(event_specs, created_events):
+            if created_event:
+                self.logger.info(
+                    "Created calendar event: %s on %s",
+                    spec["summary"],
+                    spec["start_time"],
+                )
+        return created_events
+
+    def is_event_up_to_date(self, event, shift, start_time, end_time):
+        """Tell whether a synced event still matches its Silae shift.
 
-        return created_event
+        Compares the shift hash stored at sync time, and the event's live
+        times, which may have been edited in Google Calendar since.
+        """
+        private = event.get("extendedProperties", {}).get("private", {})
+        if private.get("silae_hash") != shift_hash(shift):
+            return False
+        event_start = event["start"].get("dateTime")
+        event_end = event["end"].get("dateTime")
+        return (
+            event_start is not None
+            and event_end is not None
+            and datetime.fromisoformat(event_start) == start_time
+            and datetime.fromisoformat(event_end) == end_time
+        )
 
-    def get_events_for_date(self, existing_events, target_date):
-        """Get events that occur on a specific date."""
-        return self.calendar_api.get_events_for_date(existing_events, target_date)
+    def find_shift_event(self, events, shift):
+        """Find the calendar event previously synced for a Silae shift."""
+        shift_id = str(shift["id"])
+        for event in events:
+            private = event.get("extendedProperties", {}).get("private", {})
+            if private.get("silae_shift_id") == shift_id:
+                return event
+        return None
 
     def sync_shifts_to_calendar(self):
         """Main sync function."""
         self.logger.info("Starting weekly shift sync...")
-        self.logger.info(f"Sync time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
         try:
             self.logger.info("Logging into Silae...")
@@ -130,8 +179,9 @@ Shift Details:
                 self.silae_username,
                 self.silae_password,
                 self.base_url,
-                verify_ssl=config.SILAE_VERIFY_SSL,
-                ca_bundle=config.SILAE_CA_BUNDLE,
+                verify_ssl=self.config.SILAE_VERIFY_SSL,
+                ca_bundle=self.config.SILAE_CA_BUNDLE,
+                cookies_file=self.config.get_silae_cookies_path(),
             )
             session = adapter.session
 
@@ -139,59 +189,126 @@ Shift Details:
                 self.logger.error("Failed to login to Silae portal")
                 return False
 
-            start_date_str, end_date_str = self.get_next_4_week_dates()
+            start_date, end_date = self.get_next_4_week_dates()
             self.logger.info(
-                f"Syncing shifts for period: {start_date_str} to {end_date_str}"
+                "Syncing shifts for period: %s to %s", start_date, end_date
             )
 
             self.logger.info("Fetching planning events from Silae...")
-            planning_events = get_planning_events(
-                session, date_from=start_date_str, date_to=end_date_str, view="week"
+            # Same logged-in session (and its keep-alive pool) as the login
+            planning_events = adapter.get_planning_events(
+                date_from=start_date.isoformat(),
+                date_to=end_date.isoformat(),
+                view="week",
             )
 
+            if planning_events is None:
+                self.logger.error("Failed to fetch planning events from Silae")
+                return False
             if not planning_events:
                 self.logger.info("No planning events found for this period")
                 return True
 
-            shifts = get_employee_shifts(planning_events, self.employee_id)
-            work_shifts = [shift for shift in shifts if shift.get("type") == "WORK"]
-            self.logger.info(f"Found {len(work_shifts)} work shifts")
+            work_shifts = get_employee_shifts(
+                planning_events, self.employee_id, event_type="WORK"
+            )
+            self.logger.info("Found %d work shifts", len(work_shifts))
 
-            start_datetime = datetime.strptime(start_date_str, "%Y-%m-%d")
-            end_datetime = datetime.strptime(end_date_str, "%Y-%m-%d") + timedelta(
-                days=1
+            start_datetime = datetime.combine(start_date, time.min, self.timezone)
+            end_datetime = datetime.combine(
+                end_date + timedelta(days=1), time.min, self.timezone
             )
-            start_datetime = self.timezone.localize(start_datetime)
-            end_datetime = self.timezone.localize(end_datetime)
 
             existing_events = self.get_existing_calendar_events(
                 start_datetime, end_datetime
             )
-            self.logger.info(f"Found {len(existing_events)} existing calendar events")
+            self.logger.info("Found %d existing calendar events", len(existing_events))
 
-            for existing_event in existing_events:
-                self.logger.info(
-                    f"Deleting existing event: {existing_event.get('summary', 'Untitled')}"
-                )
-                self.delete_calendar_event(existing_event["id"])
+            # Keyed on local start dates, like the shifts below
+            events_by_date = self.calendar_api.index_events_by_date(
+                existing_events, self.timezone
+            )
 
-            for shift in work_shifts:
-                shift_date = parse_silae_time(shift["start"])
-                if not shift_date:
+            event_specs = []
+            event_patches = []
+            unchanged_count = 0
+            parsed_shifts = [
+                (shift, parse_silae_time(shift["start"]), parse_silae_time(shift["end"]))
+                for shift in work_shifts
+            ]
+            for shift, start_time, end_time in parsed_shifts:
+                if not start_time or not end_time:
+                    self.logger.error(
+                        "Failed to parse times for shift %s", shift.get("id")
+                    )
                     continue
 
                 self.logger.info(
-                    f"Processing shift: {shift['label']} on {shift_date.strftime('%Y-%m-%d %H:%M')}"
+                    "Processing shift: %s on %s", shift["label"], start_time
                 )
 
-                self.create_calendar_event(shift)
+                # Claim the event already synced for this shift, if any
+                events_on_date = self.calendar_api.get_events_for_date(
+                    existing_events,
+                    start_time.astimezone(self.timezone),
+                    index=events_by_date,
+                )
+                existing_event = self.find_shift_event(events_on_date, shift)
+                if existing_event is not None:
+                    events_on_date.remove(existing_event)
+                    if self.is_event_up_to_date(
+                        existing_event, shift, start_time, end_time
+                    ):
+                        unchanged_count += 1
+                        continue
+
+                event_spec = self.build_calendar_event(shift, start_time, end_time)
+                if existing_event is not None:
+                    event_patches.append((existing_event["id"], event_spec))
+                else:
+                    event_specs.append(event_spec)
+
+            self.logger.info("%d shifts unchanged since last sync", unchanged_count)
+
+            # Events not claimed by any shift are stale
+            stale_events = [
+                event
+                for events_on_date in events_by_date.values()
+                for event in events_on_date
+            ]
+
+            for existing_event in stale_events:
+                self.logger.info(
+                    "Deleting existing event: %s",
+                    existing_event.get("summary", "Untitled"),
+                )
+            # Writes are retried on transient errors; whatever still failed
+            # fails the run, so that the next one picks it up
+            failed_count = 0
+            if stale_events:
+                deleted_count = self.delete_calendar_events(
+                    event["id"] for event in stale_events
+                )
+                failed_count += len(stale_events) - deleted_count
+
+            if event_patches:
+                patched_events = self.calendar_api.batch_patch_events(event_patches)
+                failed_count += patched_events.count(None)
+            if event_specs:
+                created_events = self.create_calendar_events(event_specs)
+                failed_count += created_events.count(None)
+
+            if failed_count:
+                self.logger.error("%d calendar changes failed", failed_count)
+                return False
 
             self.logger.info(
-                f"Sync completed successfully! Processed {len(work_shifts)} work shifts."
+                "Sync completed successfully! Processed %d work shifts.",
+                len(work_shifts),
             )
             return True
         except Exception as error:
-            self.logger.error(f"ERROR during sync: {error}")
+            self.logger.error("ERROR during sync: %s", error)
             return False
 
     def run(self):
@@ -210,13 +327,13 @@ def main():
         sync_service = WeeklyShiftSync()
         sync_service.run()
     except ValueError as error:
-        logging.error(f"Configuration error: {error}")
+        logging.error("Configuration error: %s", error)
         logging.error(
             "Please check your environment variables. See .env.example for required variables."
         )
         sys.exit(1)
     except Exception as error:
-        logging.error(f"Unexpected error: {error}")
+        logging.error("Unexpected error: %s", error)
         sys.exit(1)
 
 